@@ -19,41 +19,70 @@ from __future__ import annotations
 import json
 import re
 import logging
+import secrets
 from http import HTTPStatus
 from datetime import datetime
-from typing import Dict, Any, TYPE_CHECKING
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
-from web.services import get_config_service, get_analysis_service, get_market_service
-from web.templates import render_config_page
+from web.services import get_config_service, get_analysis_service, get_market_service, AnalysisService
+from web.templates import render_config_page_asset, render_error_page, DEFERRED_CSS_ASSET, ANALYSIS_JS_ASSET, MD_WORKER_JS_ASSET, StaticAsset
 
 if TYPE_CHECKING:
     from http.server import BaseHTTPRequestHandler
 
 logger = logging.getLogger(__name__)
 
+# SSE 无变更时的心跳间隔（秒），用于及时发现已断开的连接
+_SSE_KEEPALIVE_SECONDS = 15.0
+
+# 批量查询单次最多接受的任务数
+_MAX_BATCH_TASK_IDS = 100
+
+# 带内容哈希 URL 的静态资源可永久缓存；页面 URL 固定，每次需用 ETag 协商
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 任务列表 ETag 前缀：任务版本号随进程重启归零，加上进程级随机前缀避免新旧进程的 ETag 撞车
+_TASKS_ETAG_SEED = secrets.token_hex(4)
+
 
 # ============================================================
 # 响应辅助类
 # ============================================================
 
 class Response:
-    """HTTP 响应封装"""
+    """
+    HTTP 响应封装
+
+    传入 etag 时响应可被协商缓存：请求的 If-None-Match 命中则只返回 304
+    """
     
     def __init__(
         self,
         body: bytes,
         status: HTTPStatus = HTTPStatus.OK,
-        content_type: str = "text/html; charset=utf-8"
+        content_type: str = "text/html; charset=utf-8",
+        etag: Optional[str] = None
     ):
         self.body = body
         self.status = status
         self.content_type = content_type
+        self.etag = etag
     
     def send(self, handler: 'BaseHTTPRequestHandler') -> None:
         """发送响应到客户端"""
+        if self.etag is not None and self.etag in handler.headers.get("If-None-Match", ""):
+            handler.send_response(HTTPStatus.NOT_MODIFIED)
+            handler.send_header("ETag", self.etag)
+            handler.end_headers()
+            return
+        
         handler.send_response(self.status)
         handler.send_header("Content-Type", self.content_type)
         handler.send_header("Content-Length", str(len(self.body)))
+        if self.etag is not None:
+            handler.send_header("ETag", self.etag)
+            handler.send_header("Cache-Control", _REVALIDATE_CACHE_CONTROL)
         handler.end_headers()
         handler.wfile.write(self.body)
 
@@ -64,29 +93,134 @@ class JsonResponse(Response):
     def __init__(
         self,
         data: Dict[str, Any],
-        status: HTTPStatus = HTTPStatus.OK
+        status: HTTPStatus = HTTPStatus.OK,
+        etag: Optional[str] = None
     ):
         body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
         super().__init__(
             body=body,
             status=status,
-            content_type="application/json; charset=utf-8"
+            content_type="application/json; charset=utf-8",
+            etag=etag
         )
 
 
-class HtmlResponse(Response):
-    """HTML 响应封装"""
-    
-    def __init__(
-        self,
-        body: bytes,
-        status: HTTPStatus = HTTPStatus.OK
-    ):
-        super().__init__(
-            body=body,
-            status=status,
-            content_type="text/html; charset=utf-8"
-        )
+class ErrorPageResponse(Response):
+    """
+    错误页响应封装
+
+    客户端接受 gzip 时返回基于预压缩外壳拼出的压缩页面
+    """
+
+    def __init__(self, status: HTTPStatus, message: str, details: Optional[str] = None):
+        super().__init__(body=b"", status=status)
+        self.message = message
+        self.details = details
+
+    def send(self, handler: 'BaseHTTPRequestHandler') -> None:
+        """发送响应到客户端"""
+        gzip_encoded = "gzip" in handler.headers.get("Accept-Encoding", "")
+        body = render_error_page(int(self.status), self.message, self.details, gzip_encoded=gzip_encoded)
+
+        handler.send_response(self.status)
+        handler.send_header("Content-Type", self.content_type)
+        if gzip_encoded:
+            handler.send_header("Content-Encoding", "gzip")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Vary", "Accept-Encoding")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class StaticResponse(Response):
+    """
+    静态资源响应封装
+
+    按 Accept-Encoding 选择预压缩的字节串，If-None-Match 命中时返回 304
+    默认用于 URL 带内容哈希的资源（可长期缓存），页面等固定 URL 需传入 no-cache
+    """
+
+    def __init__(self, asset: StaticAsset, cache_control: str = _IMMUTABLE_CACHE_CONTROL):
+        super().__init__(body=asset.body, content_type=asset.content_type)
+        self.asset = asset
+        self.cache_control = cache_control
+
+    def send(self, handler: 'BaseHTTPRequestHandler') -> None:
+        """发送响应到客户端"""
+        asset = self.asset
+        if asset.etag in handler.headers.get("If-None-Match", ""):
+            handler.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_cache_headers(handler)
+            handler.end_headers()
+            return
+
+        accept_encoding = handler.headers.get("Accept-Encoding", "")
+        encoding = None
+        body = asset.body
+        if asset.br is not None and "br" in accept_encoding:
+            encoding, body = "br", asset.br
+        elif "gzip" in accept_encoding:
+            encoding, body = "gzip", asset.gzip
+
+        handler.send_response(self.status)
+        handler.send_header("Content-Type", self.content_type)
+        if encoding:
+            handler.send_header("Content-Encoding", encoding)
+        handler.send_header("Content-Length", str(len(body)))
+        self._send_cache_headers(handler)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _send_cache_headers(self, handler: 'BaseHTTPRequestHandler') -> None:
+        handler.send_header("ETag", self.asset.etag)
+        handler.send_header("Vary", "Accept-Encoding")
+        handler.send_header("Cache-Control", self.cache_control)
+
+
+class EventStreamResponse(Response):
+    """
+    任务状态推送响应（Server-Sent Events）
+
+    连接保持打开，任务变更时推送 task_update 事件、删除时推送 task_delete 事件，空闲时发送注释心跳
+    """
+
+    def __init__(self, analysis_service: AnalysisService):
+        super().__init__(body=b"", content_type="text/event-stream; charset=utf-8")
+        self.analysis_service = analysis_service
+
+    def send(self, handler: 'BaseHTTPRequestHandler') -> None:
+        """持续推送任务变更，直到客户端断开"""
+        handler.send_response(self.status)
+        handler.send_header("Content-Type", self.content_type)
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("X-Accel-Buffering", "no")
+        handler.end_headers()
+
+        version = self.analysis_service.task_version
+        try:
+            handler.wfile.write(b"retry: 3000\n\n")
+            handler.wfile.flush()
+            while True:
+                version, changed = self.analysis_service.wait_task_changes(version, _SSE_KEEPALIVE_SECONDS)
+                if changed:
+                    chunk = b"".join(self._format_event(task) for task in changed)
+                else:
+                    chunk = b": keepalive\n\n"
+                handler.wfile.write(chunk)
+                handler.wfile.flush()
+        except OSError as e:
+            # 响应头和部分事件已发出，任何写入错误都只能结束连接，不能再交给路由层发送错误页
+            logger.debug(f"[ApiHandler] 任务推送连接已断开: {e!r}")
+
+    @staticmethod
+    def _format_event(task: Dict[str, Any]) -> bytes:
+        """编码单个 SSE 事件"""
+        if task.get("deleted"):
+            event, payload = b"task_delete", {"task_id": task["task_id"]}
+        else:
+            event, payload = b"task_update", task
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return b"event: " + event + b"\ndata: " + data + b"\n\n"
 
 
 # ============================================================
@@ -101,10 +235,8 @@ class PageHandler:
     
     def handle_index(self) -> Response:
         """处理首页请求 GET /"""
-        stock_list = self.config_service.get_stock_list()
-        env_filename = self.config_service.get_env_filename()
-        body = render_config_page(stock_list, env_filename)
-        return HtmlResponse(body)
+        asset = render_config_page_asset()
+        return StaticResponse(asset, cache_control=_REVALIDATE_CACHE_CONTROL)
     
     def handle_update(self, form_data: Dict[str, list]) -> Response:
         """
@@ -114,10 +246,21 @@ class PageHandler:
             form_data: 表单数据
         """
         stock_list = form_data.get("stock_list", [""])[0]
-        normalized = self.config_service.set_stock_list(stock_list)
-        env_filename = self.config_service.get_env_filename()
-        body = render_config_page(normalized, env_filename, message="已保存")
-        return HtmlResponse(body)
+        self.config_service.set_stock_list(stock_list)
+        asset = render_config_page_asset(message="已保存")
+        return StaticResponse(asset, cache_control=_REVALIDATE_CACHE_CONTROL)
+
+    def handle_deferred_css(self) -> Response:
+        """处理延迟样式表请求 GET /static/app.{hash}.css"""
+        return StaticResponse(DEFERRED_CSS_ASSET)
+
+    def handle_analysis_js(self) -> Response:
+        """处理分析组件脚本请求 GET /static/analysis.{hash}.js"""
+        return StaticResponse(ANALYSIS_JS_ASSET)
+
+    def handle_md_worker_js(self) -> Response:
+        """处理 Markdown 解析 Worker 脚本请求 GET /static/md-worker.{hash}.js"""
+        return StaticResponse(MD_WORKER_JS_ASSET)
 
 
 # ============================================================
@@ -129,6 +272,7 @@ class ApiHandler:
     
     def __init__(self):
         self.analysis_service = get_analysis_service()
+        self.market_service = get_market_service()
     
     def handle_health(self) -> Response:
         """
@@ -212,8 +356,10 @@ class ApiHandler:
         except ValueError:
             limit = 20
         
-        tasks = self.analysis_service.list_tasks(limit=limit)
-        return JsonResponse({"success": True, "tasks": tasks})
+        # 版本号与列表在同一把锁内取得（含清理过期任务后的递增），ETag 与返回内容严格对应
+        version, tasks = self.analysis_service.list_tasks_versioned(limit=limit)
+        etag = f'"{_TASKS_ETAG_SEED}-{version}-{limit}"'
+        return JsonResponse({"success": True, "tasks": tasks}, etag=etag)
     
     def handle_task_status(self, query: Dict[str, list]) -> Response:
         """
@@ -240,6 +386,46 @@ class ApiHandler:
         
         return JsonResponse({"success": True, "task": task})
 
+    def handle_tasks_batch(self, query: Dict[str, list]) -> Response:
+        """
+        批量查询任务状态 GET /tasks/batch?ids=a,b,c
+        
+        Args:
+            query: URL 查询参数 (ids 逗号分隔，最多 _MAX_BATCH_TASK_IDS 个)
+            
+        返回:
+            {
+                "success": true,
+                "tasks": [...],
+                "missing": [...]   # 不存在（已删除/已过期）的任务ID
+            }
+        """
+        task_ids = [
+            tid.strip()
+            for raw in query.get("ids", [])
+            for tid in raw.split(",")
+            if tid.strip()
+        ]
+        if not task_ids:
+            return JsonResponse(
+                {"success": False, "error": "缺少必填参数: ids (任务ID列表)"},
+                status=HTTPStatus.BAD_REQUEST
+            )
+        task_ids = list(dict.fromkeys(task_ids))[:_MAX_BATCH_TASK_IDS]
+        
+        tasks = self.analysis_service.get_tasks_status(task_ids)
+        found = {task.get("task_id") for task in tasks}
+        missing = [tid for tid in task_ids if tid not in found]
+        return JsonResponse({"success": True, "tasks": tasks, "missing": missing})
+
+    def handle_task_stream(self) -> Response:
+        """
+        订阅任务状态变更 GET /tasks/stream
+        
+        SSE 推送：task_update 事件为任务的完整 JSON，task_delete 事件为 {"task_id": ...}
+        """
+        return EventStreamResponse(self.analysis_service)
+
     def handle_delete_task(self, form_data: Dict[str, list]) -> Response:
         """
         删除任务 POST /task/delete
@@ -278,14 +464,12 @@ class ApiHandler:
                 "data": { "date": "...", "report": "...", ... }
             }
         """
-        market_service = get_market_service()
-        
         # 检查是否需要强制刷新
         refresh_list = query.get("refresh", ["0"])
         force_refresh = refresh_list[0] == "1"
         
         try:
-            review = market_service.get_today_review(force_refresh=force_refresh)
+            review = self.market_service.get_today_review(force_refresh=force_refresh)
             
             if "error" in review:
                 return JsonResponse(
@@ -308,15 +492,13 @@ class ApiHandler:
         Args:
             query: URL 查询参数 (可选 limit)
         """
-        market_service = get_market_service()
-        
         limit_list = query.get("limit", ["7"])
         try:
             limit = int(limit_list[0])
         except ValueError:
             limit = 7
         
-        reviews = market_service.list_reviews(limit=limit)
+        reviews = self.market_service.list_reviews(limit=limit)
         return JsonResponse({"success": True, "reviews": reviews})
 
 
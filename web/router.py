@@ -18,10 +18,10 @@ from typing import Callable, Dict, List, Optional, TYPE_CHECKING, Tuple
 from urllib.parse import parse_qs, urlparse
 
 from web.handlers import (
-    Response, HtmlResponse,
+    Response, ErrorPageResponse,
     get_page_handler, get_api_handler
 )
-from web.templates import render_error_page
+from web.templates import DEFERRED_CSS_URL, ANALYSIS_JS_URL, MD_WORKER_JS_URL
 
 if TYPE_CHECKING:
     from http.server import BaseHTTPRequestHandler
@@ -213,8 +213,7 @@ class Router:
         path: str
     ) -> None:
         """发送 404 响应"""
-        body = render_error_page(404, "页面未找到", f"路径 {path} 不存在")
-        response = HtmlResponse(body, status=HTTPStatus.NOT_FOUND)
+        response = ErrorPageResponse(HTTPStatus.NOT_FOUND, "页面未找到", f"路径 {path} 不存在")
         response.send(request_handler)
     
     def _send_error(
@@ -223,8 +222,7 @@ class Router:
         message: str
     ) -> None:
         """发送 500 响应"""
-        body = render_error_page(500, "服务器内部错误", message)
-        response = HtmlResponse(body, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+        response = ErrorPageResponse(HTTPStatus.INTERNAL_SERVER_ERROR, "服务器内部错误", message)
         response.send(request_handler)
 
 
@@ -252,6 +250,24 @@ def create_default_router() -> Router:
         lambda form: page_handler.handle_update(form),
         "更新配置"
     )
+
+    router.register(
+        DEFERRED_CSS_URL, "GET",
+        lambda q: page_handler.handle_deferred_css(),
+        "延迟加载样式表"
+    )
+
+    router.register(
+        ANALYSIS_JS_URL, "GET",
+        lambda q: page_handler.handle_analysis_js(),
+        "分析组件脚本"
+    )
+
+    router.register(
+        MD_WORKER_JS_URL, "GET",
+        lambda q: page_handler.handle_md_worker_js(),
+        "Markdown 解析 Worker"
+    )
     
     # === API 路由 ===
     router.register(
@@ -272,6 +288,18 @@ def create_default_router() -> Router:
         "查询任务列表"
     )
     
+    router.register(
+        "/tasks/stream", "GET",
+        lambda q: api_handler.handle_task_stream(),
+        "订阅任务状态变更"
+    )
+    
+    router.register(
+        "/tasks/batch", "GET",
+        lambda q: api_handler.handle_tasks_batch(q),
+        "批量查询任务状态"
+    )
+    
     router.register(
         "/task", "GET",
         lambda q: api_handler.handle_task_status(q),
@@ -13,24 +13,57 @@ from __future__ import annotations
 
 import os
 import re
+import json
+import time
+import bisect
+import atexit
 import logging
+import functools
 import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Set, Tuple, BinaryIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+
+def _json_loads(raw: bytes) -> Any:
+    """解析 JSON 字节串（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为紧凑 JSON 字节串（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
 # ============================================================
 # 配置管理服务
 # ============================================================
 
 _ENV_PATH = os.getenv("ENV_FILE", ".env")
 
+# 持久化数据目录（项目根目录下的 data/）
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# 多行模式下整文件扫描；[^\S\n] 匹配除换行外的空白，避免跨行匹配
 _STOCK_LIST_RE = re.compile(
-    r"^(?P<prefix>\s*STOCK_LIST\s*=\s*)(?P<value>.*?)(?P<suffix>\s*)$"
+    r"^(?P<prefix>[^\S\n]*STOCK_LIST[^\S\n]*=[^\S\n]*)(?P<value>.*?)(?P<suffix>[^\S\n]*)$",
+    re.MULTILINE
 )
 
+# 股票列表分隔符：逗号或换行
+_STOCK_SPLIT_RE = re.compile(r"[,\n]+")
+
 
 class ConfigService:
     """
@@ -39,21 +72,44 @@ class ConfigService:
     负责 .env 文件中 STOCK_LIST 的读写操作
     """
     
+    # 文件内容缓存: {env_path: (st_mtime_ns, st_size, text)}
+    _env_cache: Dict[str, Tuple[int, int, str]] = {}
+    _env_cache_lock = threading.Lock()
+    
     def __init__(self, env_path: Optional[str] = None):
         self.env_path = env_path or _ENV_PATH
     
     def read_env_text(self) -> str:
-        """读取 .env 文件内容"""
+        """读取 .env 文件内容（按 mtime/size 校验的读穿透缓存）"""
         try:
-            with open(self.env_path, "r", encoding="utf-8") as f:
-                return f.read()
+            st = os.stat(self.env_path)
         except FileNotFoundError:
+            with self._env_cache_lock:
+                self._env_cache.pop(self.env_path, None)
             return ""
+        
+        with self._env_cache_lock:
+            cached = self._env_cache.get(self.env_path)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                return cached[2]
+            
+            try:
+                with open(self.env_path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                self._env_cache.pop(self.env_path, None)
+                return ""
+            
+            self._env_cache[self.env_path] = (st.st_mtime_ns, st.st_size, text)
+            return text
     
     def write_env_text(self, text: str) -> None:
-        """写入 .env 文件内容"""
-        with open(self.env_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        """写入 .env 文件内容（同步刷新缓存）"""
+        with self._env_cache_lock:
+            with open(self.env_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            st = os.stat(self.env_path)
+            self._env_cache[self.env_path] = (st.st_mtime_ns, st.st_size, text)
     
     def get_stock_list(self) -> str:
         """获取当前自选股列表字符串"""
@@ -72,6 +128,11 @@ class ConfigService:
         """
         env_text = self.read_env_text()
         normalized = self._normalize_stock_list(stock_list)
+        
+        # 内容未变化时不重写文件
+        if self._extract_stock_list(env_text) == normalized:
+            return normalized
+        
         updated = self._update_stock_list(env_text, normalized)
         self.write_env_text(updated)
         return normalized
@@ -82,52 +143,92 @@ class ConfigService:
     
     def _extract_stock_list(self, env_text: str) -> str:
         """从环境文件中提取 STOCK_LIST 值"""
-        for line in env_text.splitlines():
-            m = _STOCK_LIST_RE.match(line)
-            if m:
-                raw = m.group("value").strip()
-                # 去除引号
-                if (raw.startswith('"') and raw.endswith('"')) or \
-                   (raw.startswith("'") and raw.endswith("'")):
-                    raw = raw[1:-1]
-                return raw
-        return ""
+        m = _STOCK_LIST_RE.search(env_text)
+        if not m:
+            return ""
+        raw = m.group("value").strip()
+        # 去除引号
+        if (raw.startswith('"') and raw.endswith('"')) or \
+           (raw.startswith("'") and raw.endswith("'")):
+            raw = raw[1:-1]
+        return raw
     
     def _normalize_stock_list(self, value: str) -> str:
         """规范化股票列表格式"""
-        parts = [p.strip() for p in value.replace("\n", ",").split(",")]
-        parts = [p for p in parts if p]
-        return ",".join(parts)
+        return ",".join(filter(None, (p.strip() for p in _STOCK_SPLIT_RE.split(value))))
     
     def _update_stock_list(self, env_text: str, new_value: str) -> str:
         """更新环境文件中的 STOCK_LIST"""
-        lines = env_text.splitlines(keepends=False)
-        out_lines: List[str] = []
-        replaced = False
-        
-        for line in lines:
-            m = _STOCK_LIST_RE.match(line)
-            if not m:
-                out_lines.append(line)
-                continue
-            
-            out_lines.append(f"{m.group('prefix')}{new_value}{m.group('suffix')}")
-            replaced = True
+        updated, replaced = _STOCK_LIST_RE.subn(
+            lambda m: f"{m.group('prefix')}{new_value}{m.group('suffix')}",
+            env_text
+        )
+        if replaced:
+            return updated
         
-        if not replaced:
-            if out_lines and out_lines[-1].strip() != "":
-                out_lines.append("")
-            out_lines.append(f"STOCK_LIST={new_value}")
+        # 未找到 STOCK_LIST，追加到文件末尾（与上一段内容空一行）
+        line = f"STOCK_LIST={new_value}"
+        if not env_text:
+            return line + "\n"
         
-        trailing_newline = env_text.endswith("\n") if env_text else True
-        out = "\n".join(out_lines)
-        return out + ("\n" if trailing_newline else "")
+        trailing_newline = env_text.endswith("\n")
+        head = env_text if trailing_newline else env_text + "\n"
+        if head[:-1].rsplit("\n", 1)[-1].strip():
+            head += "\n"
+        return head + line + ("\n" if trailing_newline else "")
 
 
 # ============================================================
 # 分析任务服务
 # ============================================================
 
+# 任务写盘合并窗口（秒）：窗口内的多次状态变更只触发一次写盘
+_TASK_SAVE_DELAY = 0.5
+
+# 任务保留时长（3天）
+_TASK_RETENTION_SECONDS = 3 * 24 * 3600
+
+# 日志行数超过存活任务数的该倍数时，加载时压缩为快照
+_TASK_LOG_COMPACT_RATIO = 10
+
+# 保留的删除记录数（供 SSE 推送 task_delete），超出后淘汰最早的记录
+_MAX_DELETED_VERSIONS = 256
+
+
+def _task_upsert_record(task: Dict[str, Any]) -> bytes:
+    """任务日志记录：新增/更新"""
+    return _json_dumps({"op": "upsert", "task": task}) + b"\n"
+
+
+def _task_delete_record(task_id: str) -> bytes:
+    """任务日志记录：删除"""
+    return _json_dumps({"op": "delete", "task_id": task_id}) + b"\n"
+
+
+def _serialize_tasks(tasks: Dict[str, Dict[str, Any]]) -> bytes:
+    """将任务字典序列化为日志快照"""
+    return b"".join(_task_upsert_record(task) for task in tasks.values())
+
+
+def _task_start_ts(task: Dict[str, Any]) -> Optional[float]:
+    """
+    获取任务开始时间戳
+    
+    旧数据没有 start_ts 字段时，从 start_time 解析一次并回填
+    """
+    ts = task.get('start_ts')
+    if ts is None:
+        start_time_str = task.get('start_time')
+        if not start_time_str:
+            return None
+        try:
+            ts = datetime.fromisoformat(start_time_str).timestamp()
+        except ValueError:
+            return None
+        task['start_ts'] = ts
+    return ts
+
+
 class AnalysisService:
     """
     分析任务服务
@@ -138,30 +239,41 @@ class AnalysisService:
     3. 触发通知推送
     """
     
-    _instance: Optional['AnalysisService'] = None
-    _lock = threading.Lock()
-    
     def __init__(self, max_workers: int = 3):
         self._executor: Optional[ThreadPoolExecutor] = None
         self._max_workers = max_workers
         self._tasks: Dict[str, Dict[str, Any]] = {}
+        # 按开始时间升序的索引 [(start_ts, task_id)]，用于快速列出最近任务和清理过期任务
+        self._task_index: List[Tuple[float, str]] = []
         self._tasks_lock = threading.RLock()
+        self._loaded = False
+        # 追加写日志：每次状态变更只追加一行，加载时回放
+        self._task_file = os.path.join(_DATA_DIR, "tasks.jsonl")
+        # 旧版整文件快照，首次加载时迁移到日志
+        self._legacy_task_file = os.path.join(_DATA_DIR, "tasks.json")
+        self._log_fp: Optional[BinaryIO] = None
+        self._log_lock = threading.Lock()
         
-        # 初始化时加载任务
-        self._load_tasks()
-        self._tasks_lock = threading.RLock()
+        # 单线程写盘器：保证同一时刻最多一个写盘任务，线程在首次提交时创建并复用
+        self._dirty_ids: Set[str] = set()
+        self._save_scheduled = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tasks_writer_")
+        atexit.register(self._flush_tasks)
+        
+        # 任务变更通知：每次变更版本号递增，SSE 连接据此等待并取回变更
+        self._task_changed = threading.Condition(self._tasks_lock)
+        self._task_version = 0
+        # 两者均按版本号升序排列：存活任务 {task_id: 最后变更的版本号}，已删除任务 {task_id: 删除时的版本号}
+        self._task_versions: OrderedDict[str, int] = OrderedDict()
+        self._deleted_versions: OrderedDict[str, int] = OrderedDict()
         
         # 初始化时加载任务
         self._load_tasks()
     
     @classmethod
     def get_instance(cls) -> 'AnalysisService':
-        """获取单例实例"""
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = cls()
-        return cls._instance
+        """获取单例实例（兼容旧接口，等同于 get_analysis_service()）"""
+        return get_analysis_service()
     
     @property
     def executor(self) -> ThreadPoolExecutor:
@@ -175,148 +287,163 @@ class AnalysisService:
 
     def _get_task_file_path(self) -> str:
         """获取任务持久化文件路径"""
-        return os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tasks.json")
+        return self._task_file
 
     def _load_tasks(self) -> None:
-        """从文件加载任务"""
-        task_file = self._get_task_file_path()
-        if not os.path.exists(task_file):
+        """从日志回放任务（仅首次调用时生效）"""
+        if self._loaded:
             return
-
+        self._loaded = True
+        
+        task_file = self._get_task_file_path()
+        migrating = False
         try:
-            import json
-            with open(task_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
+            if os.path.exists(task_file):
+                data, line_count, clean_tail = self._replay_task_log(task_file)
+            elif os.path.exists(self._legacy_task_file):
+                with open(self._legacy_task_file, 'rb', buffering=0) as f:
+                    data = _json_loads(f.read())
+                line_count, clean_tail = len(data), True
+                migrating = True
+            else:
+                return
+            
             # 清理3天前的数据
-            now = datetime.now()
+            cutoff = time.time() - _TASK_RETENTION_SECONDS
             valid_tasks = {}
-            has_changes = False
-            
             for task_id, task in data.items():
-                start_time_str = task.get('start_time')
-                if not start_time_str:
-                    continue
-                    
-                try:
-                    start_time = datetime.fromisoformat(start_time_str)
-                    # 保留3天内的任务 (72小时)
-                    if (now - start_time).total_seconds() <= 3 * 24 * 3600:
-                        valid_tasks[task_id] = task
-                    else:
-                        has_changes = True
-                except ValueError:
-                    continue
+                start_ts = _task_start_ts(task)
+                if start_ts is not None and start_ts >= cutoff:
+                    valid_tasks[task_id] = task
+            has_changes = len(valid_tasks) != len(data)
             
             with self._tasks_lock:
                 self._tasks = valid_tasks
-                
-            if has_changes:
-                self._save_tasks()
+                self._task_index = sorted(
+                    (task['start_ts'], task_id) for task_id, task in valid_tasks.items()
+                )
+            
+            # 有过期数据、旧格式迁移、尾部残缺或日志膨胀时，直接以本次过滤结果重写快照
+            if has_changes or migrating or not clean_tail or \
+               line_count > _TASK_LOG_COMPACT_RATIO * max(len(valid_tasks), 1):
+                self._compact_tasks(valid_tasks)
+                if migrating:
+                    os.remove(self._legacy_task_file)
                 
             logger.info(f"[AnalysisService] 已加载 {len(self._tasks)} 个历史任务")
         except Exception as e:
             logger.error(f"[AnalysisService] 加载任务失败: {e}")
 
-    def _save_tasks(self) -> None:
-        """保存任务到文件"""
+    def _replay_task_log(self, task_file: str) -> Tuple[Dict[str, Dict[str, Any]], int, bool]:
+        """
+        回放任务日志
+        
+        Returns:
+            (任务字典, 日志行数, 文件是否以完整行结尾)
+        """
+        with open(task_file, 'rb', buffering=0) as f:
+            raw = f.read()
+        
+        tasks: Dict[str, Dict[str, Any]] = {}
+        line_count = 0
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            line_count += 1
+            try:
+                record = _json_loads(line)
+            except ValueError:
+                # 进程崩溃可能残留半行，跳过
+                continue
+            if record.get('op') == 'delete':
+                tasks.pop(record.get('task_id'), None)
+            else:
+                task = record.get('task') or {}
+                task_id = task.get('task_id')
+                if task_id:
+                    tasks[task_id] = task
+        
+        return tasks, line_count, (not raw or raw.endswith(b"\n"))
+
+    def _compact_tasks(self, tasks: Dict[str, Dict[str, Any]]) -> None:
+        """将任务快照重写为新日志（先写临时文件再原子替换）"""
         task_file = self._get_task_file_path()
+        os.makedirs(os.path.dirname(task_file), exist_ok=True)
+        data = _serialize_tasks(tasks)
+        
+        with self._log_lock:
+            self._close_log()
+            tmp_file = task_file + ".tmp"
+            with open(tmp_file, 'wb', buffering=1 << 20) as f:
+                f.write(data)
+            os.replace(tmp_file, task_file)
+
+    def _save_tasks(self) -> None:
+        """将待写入的任务变更追加到日志"""
         try:
-            import json
-            # 确保data目录存在
-            os.makedirs(os.path.dirname(task_file), exist_ok=True)
-            
-            with self._tasks_lock:
-                # 再次执行清理，确保保存时也不包含过期数据
-                now = datetime.now()
-                tasks_to_save = {}
-                for task_id, task in self._tasks.items():
-                    start_time_str = task.get('start_time')
-                    if start_time_str:
-                        try:
-                            start_time = datetime.fromisoformat(start_time_str)
-                            if (now - start_time).total_seconds() <= 3 * 24 * 3600:
-                                tasks_to_save[task_id] = task
-                        except ValueError:
-                            pass
+            with self._log_lock:
+                with self._tasks_lock:
+                    if not self._dirty_ids:
+                        return
+                    dirty_ids, self._dirty_ids = self._dirty_ids, set()
+                    records = [
+                        _task_upsert_record(self._tasks[task_id]) if task_id in self._tasks
+                        else _task_delete_record(task_id)
+                        for task_id in dirty_ids
+                    ]
                 
-                with open(task_file, 'w', encoding='utf-8') as f:
-                    json.dump(tasks_to_save, f, ensure_ascii=False, indent=2)
+                if self._log_fp is None:
+                    task_file = self._get_task_file_path()
+                    # 确保data目录存在
+                    os.makedirs(os.path.dirname(task_file), exist_ok=True)
+                    self._log_fp = open(task_file, 'ab', buffering=1 << 16)
+                self._log_fp.write(b"".join(records))
+                self._log_fp.flush()
         except Exception as e:
             logger.error(f"[AnalysisService] 保存任务失败: {e}")
 
-    def _get_task_file_path(self) -> str:
-        """获取任务持久化文件路径"""
-        return os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tasks.json")
+    def _close_log(self) -> None:
+        """关闭日志文件句柄（需持有 _log_lock）"""
+        if self._log_fp is not None:
+            self._log_fp.close()
+            self._log_fp = None
 
-    def _load_tasks(self) -> None:
-        """从文件加载任务"""
-        task_file = self._get_task_file_path()
-        if not os.path.exists(task_file):
-            return
+    def _mark_dirty(self, task_id: str) -> None:
+        """标记任务已变更：通知等待中的订阅者，并由写盘线程合并写盘"""
+        with self._tasks_lock:
+            self._task_version += 1
+            if task_id in self._tasks:
+                self._task_versions[task_id] = self._task_version
+                self._task_versions.move_to_end(task_id)
+                self._deleted_versions.pop(task_id, None)
+            else:
+                # 已删除：移出存活表，留一条有上限的删除记录
+                self._task_versions.pop(task_id, None)
+                self._deleted_versions[task_id] = self._task_version
+                self._deleted_versions.move_to_end(task_id)
+                while len(self._deleted_versions) > _MAX_DELETED_VERSIONS:
+                    self._deleted_versions.popitem(last=False)
+            self._task_changed.notify_all()
+            
+            self._dirty_ids.add(task_id)
+            if self._save_scheduled:
+                return
+            self._save_scheduled = True
+        self._writer.submit(self._delayed_save)
+
+    def _delayed_save(self) -> None:
+        """等待合并窗口结束后写盘一次"""
+        time.sleep(_TASK_SAVE_DELAY)
+        with self._tasks_lock:
+            self._save_scheduled = False
+        self._save_tasks()
 
-        try:
-            import json
-            with open(task_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # 清理3天前的数据
-            now = datetime.now()
-            valid_tasks = {}
-            has_changes = False
-            
-            for task_id, task in data.items():
-                start_time_str = task.get('start_time')
-                if not start_time_str:
-                    continue
-                    
-                try:
-                    start_time = datetime.fromisoformat(start_time_str)
-                    # 保留3天内的任务 (72小时)
-                    if (now - start_time).total_seconds() <= 3 * 24 * 3600:
-                        valid_tasks[task_id] = task
-                    else:
-                        has_changes = True
-                except ValueError:
-                    continue
-            
-            with self._tasks_lock:
-                self._tasks = valid_tasks
-                
-            if has_changes:
-                self._save_tasks()
-                
-            logger.info(f"[AnalysisService] 已加载 {len(self._tasks)} 个历史任务")
-        except Exception as e:
-            logger.error(f"[AnalysisService] 加载任务失败: {e}")
+    def _flush_tasks(self) -> None:
+        """进程退出前写入尚未落盘的变更"""
+        self._save_tasks()
+        with self._log_lock:
+            self._close_log()
 
-    def _save_tasks(self) -> None:
-        """保存任务到文件"""
-        task_file = self._get_task_file_path()
-        try:
-            import json
-            # 确保data目录存在
-            os.makedirs(os.path.dirname(task_file), exist_ok=True)
-            
-            with self._tasks_lock:
-                # 再次执行清理，确保保存时也不包含过期数据
-                now = datetime.now()
-                tasks_to_save = {}
-                for task_id, task in self._tasks.items():
-                    start_time_str = task.get('start_time')
-                    if start_time_str:
-                        try:
-                            start_time = datetime.fromisoformat(start_time_str)
-                            if (now - start_time).total_seconds() <= 3 * 24 * 3600:
-                                tasks_to_save[task_id] = task
-                        except ValueError:
-                            pass
-                
-                with open(task_file, 'w', encoding='utf-8') as f:
-                    json.dump(tasks_to_save, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"[AnalysisService] 保存任务失败: {e}")
-    
     def submit_analysis(self, code: str) -> Dict[str, Any]:
         """
         提交异步分析任务
@@ -346,31 +473,51 @@ class AnalysisService:
         with self._tasks_lock:
             return self._tasks.get(task_id)
 
-    def delete_task(self, task_id: str) -> bool:
+    def get_tasks_status(self, task_ids: List[str]) -> List[Dict[str, Any]]:
         """
-        删除任务
+        批量获取任务状态（一次加锁完成）
         
         Args:
-            task_id: 任务ID
+            task_ids: 任务ID列表
             
         Returns:
-            是否删除成功
+            存在的任务列表，顺序与 task_ids 一致；不存在的 ID 直接跳过
         """
         with self._tasks_lock:
-            if task_id in self._tasks:
-                del self._tasks[task_id]
-                self._save_tasks()
-                logger.info(f"[AnalysisService] 已删除任务: {task_id}")
-                return True
-            return False
+            return [self._tasks[tid] for tid in task_ids if tid in self._tasks]
+
+    @property
+    def task_version(self) -> int:
+        """当前任务变更版本号"""
+        with self._tasks_lock:
+            return self._task_version
     
-    def list_tasks(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """列出最近的任务（自动清理过期数据）"""
-        # 每次列出时触发一次加载/清理（确保数据是最新的且已清理）
-        # 注意：这里为了性能，如果是频繁调用，应该优化。目前假设调用频率不高。
-        # self._load_tasks() # 频繁IO不好，改为仅内存清理
+    def wait_task_changes(self, since: int, timeout: float) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        等待版本号 since 之后的任务变更（供 SSE 推送）
         
-
+        Args:
+            since: 调用方已知的版本号
+            timeout: 最长等待秒数
+            
+        Returns:
+            (当前版本号, 变更任务的快照列表)；已删除的任务为 {"task_id": ..., "deleted": True}
+        """
+        with self._task_changed:
+            self._task_changed.wait_for(lambda: self._task_version > since, timeout)
+            # 两张表均按版本号升序，从尾部倒序取到 since 为止，无需遍历全部任务
+            changed = []
+            for task_id, version in reversed(self._task_versions.items()):
+                if version <= since:
+                    break
+                changed.append((version, dict(self._tasks[task_id])))
+            for task_id, version in reversed(self._deleted_versions.items()):
+                if version <= since:
+                    break
+                changed.append((version, {"task_id": task_id, "deleted": True}))
+            changed.sort(key=lambda item: item[0])
+            return self._task_version, [item for _, item in changed]
+    
     def delete_task(self, task_id: str) -> bool:
         """
         删除任务
@@ -383,65 +530,60 @@ class AnalysisService:
         """
         with self._tasks_lock:
             if task_id in self._tasks:
-                del self._tasks[task_id]
-                self._save_tasks()
+                task = self._tasks.pop(task_id)
+                self._unindex_task(task.get('start_ts'), task_id)
+                self._mark_dirty(task_id)
                 logger.info(f"[AnalysisService] 已删除任务: {task_id}")
                 return True
             return False
     
     def list_tasks(self, limit: int = 100) -> List[Dict[str, Any]]:
         """列出最近的任务（自动清理过期数据）"""
-        # 每次列出时触发一次加载/清理（确保数据是最新的且已清理）
-        # 注意：这里为了性能，如果是频繁调用，应该优化。目前假设调用频率不高。
-        # self._load_tasks() # 频繁IO不好，改为仅内存清理
+        return self.list_tasks_versioned(limit)[1]
+    
+    def list_tasks_versioned(self, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        列出最近的任务，并返回生成该列表时的版本号（供任务列表 ETag 使用）
         
+        版本号在清理过期数据之后、同一把锁内读取，与返回的列表严格对应
+        
+        Returns:
+            (版本号, 任务列表)
+        """
         with self._tasks_lock:
-            # 内存中清理过期数据
-            now = datetime.now()
-            expired_ids = []
-            for task_id, task in self._tasks.items():
-                start_time_str = task.get('start_time')
-                if start_time_str:
-                    try:
-                        start_time = datetime.fromisoformat(start_time_str)
-                        if (now - start_time).total_seconds() > 3 * 24 * 3600:
-                            expired_ids.append(task_id)
-                    except ValueError:
-                        pass
-            
-            for tid in expired_ids:
-                del self._tasks[tid]
-            
-            if expired_ids:
-                # 异步保存清理结果，不阻塞读取
-                threading.Thread(target=self._save_tasks).start()
-
-            # 内存中清理过期数据
-            now = datetime.now()
-            expired_ids = []
-            for task_id, task in self._tasks.items():
-                start_time_str = task.get('start_time')
-                if start_time_str:
-                    try:
-                        start_time = datetime.fromisoformat(start_time_str)
-                        if (now - start_time).total_seconds() > 3 * 24 * 3600:
-                            expired_ids.append(task_id)
-                    except ValueError:
-                        pass
-            
-            for tid in expired_ids:
-                del self._tasks[tid]
-            
-            if expired_ids:
-                # 异步保存清理结果，不阻塞读取
-                threading.Thread(target=self._save_tasks).start()
-
-            tasks = list(self._tasks.values())
-            
-            
-        # 按开始时间倒序
-        tasks.sort(key=lambda x: x.get('start_time', ''), reverse=True)
-        return tasks[:limit]
+            # 内存中清理过期数据：索引按开始时间升序，只需从头部弹出
+            cutoff = time.time() - _TASK_RETENTION_SECONDS
+            expired = 0
+            for start_ts, task_id in self._task_index:
+                if start_ts >= cutoff:
+                    break
+                self._tasks.pop(task_id, None)
+                self._task_versions.pop(task_id, None)
+                expired += 1
+            
+            if expired:
+                # 过期任务无需写日志，下次加载回放时按保留期过滤
+                del self._task_index[:expired]
+                # 列表内容已变化，递增版本号使任务列表的 ETag 失效
+                self._task_version += 1
+            
+            # 按开始时间倒序，只取前 limit 条
+            tasks = []
+            for _, task_id in reversed(self._task_index):
+                if len(tasks) >= limit:
+                    break
+                tasks.append(self._tasks[task_id])
+            version = self._task_version
+        
+        return version, tasks
+    
+    def _unindex_task(self, start_ts: Optional[float], task_id: str) -> None:
+        """从开始时间索引中移除任务（需持有 _tasks_lock）"""
+        if start_ts is None:
+            return
+        i = bisect.bisect_left(self._task_index, (start_ts, task_id))
+        if i < len(self._task_index) and self._task_index[i] == (start_ts, task_id):
+            del self._task_index[i]
     
     def _run_analysis(self, code: str, task_id: str) -> Dict[str, Any]:
         """
@@ -450,17 +592,19 @@ class AnalysisService:
         内部方法，在线程池中运行
         """
         # 初始化任务状态
+        start_ts = time.time()
         with self._tasks_lock:
             self._tasks[task_id] = {
                 "task_id": task_id,
                 "code": code,
                 "status": "running",
-                "start_time": datetime.now().isoformat(),
+                "start_time": datetime.fromtimestamp(start_ts).isoformat(),
+                "start_ts": start_ts,
                 "result": None,
                 "error": None
             }
-        self._save_tasks() # 保存初始状态
-        self._save_tasks() # 保存初始状态
+            bisect.insort(self._task_index, (start_ts, task_id))
+        self._mark_dirty(task_id) # 保存初始状态
         
         try:
             # 延迟导入避免循环依赖
@@ -483,8 +627,6 @@ class AnalysisService:
             if result:
                 # 使用 to_dict() 保留所有字段，包括 dashboard
                 result_data = result.to_dict()
-                # 使用 to_dict() 保留所有字段，包括 dashboard
-                result_data = result.to_dict()
                 
                 with self._tasks_lock:
                     self._tasks[task_id].update({
@@ -492,8 +634,7 @@ class AnalysisService:
                         "end_time": datetime.now().isoformat(),
                         "result": result_data
                     })
-                self._save_tasks() # 保存完成状态
-                self._save_tasks() # 保存完成状态
+                self._mark_dirty(task_id) # 保存完成状态
                 
                 logger.info(f"[AnalysisService] 股票 {code} 分析完成: {result.operation_advice}")
                 return {"success": True, "task_id": task_id, "result": result_data}
@@ -504,8 +645,7 @@ class AnalysisService:
                         "end_time": datetime.now().isoformat(),
                         "error": "分析返回空结果"
                     })
-                self._save_tasks() # 保存失败状态
-                self._save_tasks() # 保存失败状态
+                self._mark_dirty(task_id) # 保存失败状态
                 
                 logger.warning(f"[AnalysisService] 股票 {code} 分析失败: 返回空结果")
                 return {"success": False, "task_id": task_id, "error": "分析返回空结果"}
@@ -520,8 +660,7 @@ class AnalysisService:
                     "end_time": datetime.now().isoformat(),
                     "error": error_msg
                 })
-            self._save_tasks() # 保存异常状态
-            self._save_tasks() # 保存异常状态
+            self._mark_dirty(task_id) # 保存异常状态
             
             return {"success": False, "task_id": task_id, "error": error_msg}
 
@@ -530,6 +669,12 @@ class AnalysisService:
 # 大盘复盘服务
 # ============================================================
 
+_REVIEW_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# 内存中最多缓存的复盘条数（LRU 淘汰）
+_MAX_CACHED_REVIEWS = 30
+
+
 class MarketService:
     """
     大盘复盘服务
@@ -539,26 +684,22 @@ class MarketService:
     2. 持久化存储复盘数据
     """
     
-    _instance: Optional['MarketService'] = None
-    _lock = threading.Lock()
-    
     def __init__(self):
-        self._reviews: Dict[str, Dict[str, Any]] = {}
+        self._reviews: OrderedDict[str, Dict[str, Any]] = OrderedDict()
         self._reviews_lock = threading.RLock()
+        # 今日复盘的快速引用 (date, review)，命中时无需加锁
+        self._today_cache: Optional[Tuple[str, Dict[str, Any]]] = None
+        self._review_file = os.path.join(_DATA_DIR, "market_reviews.json")
         self._load_reviews()
     
     @classmethod
     def get_instance(cls) -> 'MarketService':
-        """获取单例实例"""
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = cls()
-        return cls._instance
+        """获取单例实例（兼容旧接口，等同于 get_market_service()）"""
+        return get_market_service()
     
     def _get_review_file_path(self) -> str:
         """获取复盘持久化文件路径"""
-        return os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "market_reviews.json")
+        return self._review_file
     
     def _load_reviews(self) -> None:
         """从文件加载复盘数据"""
@@ -567,39 +708,44 @@ class MarketService:
             return
         
         try:
-            import json
-            with open(review_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 清理7天前的数据
-            now = datetime.now()
-            valid_reviews = {}
-            
-            for date_str, review in data.items():
-                try:
-                    review_date = datetime.strptime(date_str, '%Y-%m-%d')
-                    if (now - review_date).days <= 7:
-                        valid_reviews[date_str] = review
-                except ValueError:
-                    continue
+            # 无缓冲读取：FileIO.readall 按文件大小一次性读入，避免分块拷贝
+            with open(review_file, 'rb', buffering=0) as f:
+                data = _json_loads(f.read())
+            
+            # 清理7天前的数据（YYYY-MM-DD 可直接按字符串比较）
+            cutoff = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+            valid_reviews: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+            
+            # 按日期升序插入，保证 LRU 淘汰时先淘汰最旧的
+            for date_str in sorted(data):
+                if _REVIEW_DATE_RE.match(date_str) and date_str >= cutoff:
+                    valid_reviews[date_str] = data[date_str]
             
             with self._reviews_lock:
                 self._reviews = valid_reviews
+                self._evict_reviews()
             
             logger.info(f"[MarketService] 已加载 {len(self._reviews)} 条复盘历史")
         except Exception as e:
             logger.error(f"[MarketService] 加载复盘数据失败: {e}")
     
+    def _evict_reviews(self) -> None:
+        """淘汰最久未使用的复盘，限制内存占用（需持有 _reviews_lock）"""
+        while len(self._reviews) > _MAX_CACHED_REVIEWS:
+            self._reviews.popitem(last=False)
+    
     def _save_reviews(self) -> None:
         """保存复盘数据到文件"""
         review_file = self._get_review_file_path()
         try:
-            import json
             os.makedirs(os.path.dirname(review_file), exist_ok=True)
             
             with self._reviews_lock:
-                with open(review_file, 'w', encoding='utf-8') as f:
-                    json.dump(self._reviews, f, ensure_ascii=False, indent=2)
+                # 先写临时文件再原子替换，避免写入中断导致文件损坏
+                tmp_file = review_file + ".tmp"
+                with open(tmp_file, 'wb', buffering=1 << 20) as f:
+                    f.write(_json_dumps(self._reviews))
+                os.replace(tmp_file, review_file)
         except Exception as e:
             logger.error(f"[MarketService] 保存复盘数据失败: {e}")
     
@@ -617,9 +763,15 @@ class MarketService:
         
         # 检查缓存
         if not force_refresh:
+            cached = self._today_cache
+            if cached is not None and cached[0] == today:
+                return cached[1]
+            
             with self._reviews_lock:
                 if today in self._reviews:
                     logger.info(f"[MarketService] 使用缓存的今日复盘")
+                    self._reviews.move_to_end(today)
+                    self._today_cache = (today, self._reviews[today])
                     return self._reviews[today]
         
         # 生成新的复盘
@@ -682,6 +834,9 @@ class MarketService:
             # 保存到缓存
             with self._reviews_lock:
                 self._reviews[today] = review_data
+                self._reviews.move_to_end(today)
+                self._evict_reviews()
+                self._today_cache = (today, review_data)
             self._save_reviews()
             
             logger.info(f"[MarketService] 今日复盘生成完成")
@@ -715,7 +870,10 @@ class MarketService:
     def get_review_by_date(self, date: str) -> Optional[Dict[str, Any]]:
         """获取指定日期的复盘"""
         with self._reviews_lock:
-            return self._reviews.get(date)
+            review = self._reviews.get(date)
+            if review is not None:
+                self._reviews.move_to_end(date)
+            return review
 
 
 # ============================================================
@@ -727,12 +885,14 @@ def get_config_service() -> ConfigService:
     return ConfigService()
 
 
+@functools.lru_cache(maxsize=1)
 def get_analysis_service() -> AnalysisService:
     """获取分析服务单例"""
-    return AnalysisService.get_instance()
+    return AnalysisService()
 
 
+@functools.lru_cache(maxsize=1)
 def get_market_service() -> MarketService:
     """获取大盘服务单例"""
-    return MarketService.get_instance()
+    return MarketService()
 
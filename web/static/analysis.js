@@ -0,0 +1,963 @@
+(function() {
+    const codeInput = document.getElementById('analysis_code');
+    const submitBtn = document.getElementById('analysis_btn');
+    const taskList = document.getElementById('task_list');
+    const resultContent = document.getElementById('result_content');
+    
+    // 任务管理
+    const tasks = new Map(); // taskId -> {task, adviceClass, dateStr}
+    let taskStream = null;   // 任务状态推送（SSE）
+    const STREAM_RETRY_MIN_MS = 3000;
+    const STREAM_RETRY_MAX_MS = 15000;
+    let streamRetryDelay = STREAM_RETRY_MIN_MS;  // 断线重连间隔，逐次退避
+    let streamRetryTimer = null;
+    // 浏览器不支持 EventSource 时退回查询：每秒检查一次到期的任务，单个任务的间隔 1s → 30s 逐次退避
+    const FALLBACK_POLL_TICK_MS = 1000;
+    const FALLBACK_POLL_MIN_MS = 1000;
+    const FALLBACK_POLL_MAX_MS = 30000;
+    const pollSchedule = new Map();  // taskId -> {backoffMs, nextPollAt}
+    const MAX_TASKS_DISPLAY = 10;  // 页面最多保留的任务数（进行中的任务不受限）
+    
+    // 本地任务快照：刷新页面后先用快照渲染，再由服务端列表校正
+    const TASKS_STORAGE_KEY = 'tasks_v2';  // {etag, tasks}：etag 为快照对应的服务端任务列表版本
+    const TASKS_STORAGE_TTL_MS = 24 * 3600 * 1000;  // 已结束的任务只保留 24 小时
+    let persistTimer = null;
+    let tasksEtag = null;
+    
+    // 股票代码校验正则（只编译一次）
+    const CODE_CLEAN_RE = /[^a-z0-9]/g;
+    const A_STOCK_RE = /^\d{6}$/;        // A股: 600519
+    const HK_STOCK_RE = /^hk\d{5}$/;     // 港股: hk00700
+    let buttonStateScheduled = false;
+    
+    // 日期/时间格式化器：构造 Intl 格式化器开销大，只创建一次
+    const DATE_FMT = new Intl.DateTimeFormat('zh-CN', {year: 'numeric', month: '2-digit', day: '2-digit'});
+    const TIME_FMT = new Intl.DateTimeFormat('zh-CN', {hour: '2-digit', minute: '2-digit', second: '2-digit'});
+    
+    // 允许输入数字和字母（支持港股 hkxxxxx 格式）
+    codeInput.addEventListener('input', function(e) {
+        // 转小写，只保留字母和数字
+        this.value = this.value.toLowerCase().replace(CODE_CLEAN_RE, '');
+        if (this.value.length > 8) {
+            this.value = this.value.slice(0, 8);
+        }
+        // 连续输入时每帧只刷新一次按钮状态
+        if (!buttonStateScheduled) {
+            buttonStateScheduled = true;
+            requestAnimationFrame(() => {
+                buttonStateScheduled = false;
+                updateButtonState();
+            });
+        }
+    });
+    
+    // 任务列表的点击统一在容器上委托处理，卡片内不再内联 onclick
+    taskList.addEventListener('click', function(e) {
+        const target = e.target.closest('[data-action]');
+        if (!target) return;
+        const action = target.dataset.action;
+        if (action === 'remove') {
+            removeTask(target.dataset.taskid);
+        } else if (action === 'show') {
+            showResult(target.dataset.taskid);
+        } else if (action === 'toggle') {
+            toggleGroup(target.dataset.date);
+        }
+    });
+    
+    // 结果面板的按钮同样委托到面板容器
+    resultContent.addEventListener('click', function(e) {
+        const target = e.target.closest('[data-action]');
+        if (!target) return;
+        const action = target.dataset.action;
+        if (action === 'detail') {
+            toggleDetailMode();
+        } else if (action === 'close') {
+            closeResult();
+        }
+    });
+    
+    submitBtn.addEventListener('click', () => submitAnalysis());
+    
+    // 回车提交
+    codeInput.addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            e.preventDefault();
+            if (!submitBtn.disabled) {
+                submitAnalysis();
+            }
+        }
+    });
+    
+    // 更新按钮状态 - 支持 A股(6位数字) 或 港股(hk+5位数字)
+    function isValidCode(code) {
+        return A_STOCK_RE.test(code) || HK_STOCK_RE.test(code);
+    }
+    
+    function updateButtonState() {
+        submitBtn.disabled = !isValidCode(codeInput.value.trim().toLowerCase());
+    }
+    
+    // 格式化时间
+    function formatTime(isoString) {
+        if (!isoString) return '-';
+        return TIME_FMT.format(new Date(isoString));
+    }
+    
+    // 格式化日期为 YYYY-MM-DD（用于任务分组）
+    function formatDate(date) {
+        return DATE_FMT.format(date).replace(/\//g, '-');
+    }
+    
+    // 今天的日期（YYYY-MM-DD），缓存到本地零点再重新计算
+    let todayStr = '';
+    let todayExpiresAt = 0;
+    
+    function getToday() {
+        const now = Date.now();
+        if (now >= todayExpiresAt) {
+            const d = new Date(now);
+            todayStr = formatDate(d);
+            todayExpiresAt = new Date(d.getFullYear(), d.getMonth(), d.getDate() + 1).getTime();
+        }
+        return todayStr;
+    }
+    
+    // 计算耗时
+    function calcDuration(start, end) {
+        if (!start) return '-';
+        const startTime = new Date(start).getTime();
+        const endTime = end ? new Date(end).getTime() : Date.now();
+        const seconds = Math.floor((endTime - startTime) / 1000);
+        if (seconds < 60) return seconds + 's';
+        const minutes = Math.floor(seconds / 60);
+        const remainSec = seconds % 60;
+        return minutes + 'm' + remainSec + 's';
+    }
+    
+    // 获取建议样式类
+    function getAdviceClass(advice) {
+        if (!advice) return '';
+        if (advice.includes('买') || advice.includes('加仓')) return 'buy';
+        if (advice.includes('卖') || advice.includes('减仓')) return 'sell';
+        if (advice.includes('持有')) return 'hold';
+        return 'wait';
+    }
+    
+    // 构造任务条目，操作建议样式类和分组日期在数据到达时算好，渲染时直接读取
+    function toTaskData(task) {
+        return {
+            task: task,
+            adviceClass: getAdviceClass(task.result?.operation_advice),
+            dateStr: task.start_time ? formatDate(new Date(task.start_time)) : '未知日期'
+        };
+    }
+    
+    // 渲染单个任务卡片
+    function renderTaskCard(taskId, taskData) {
+        const task = taskData.task || {};
+        const status = task.status || 'pending';
+        const code = task.code || taskId.split('_')[0];
+        const result = task.result || {};
+        
+        let statusIcon = '⏳';
+        let statusText = '等待中';
+        if (status === 'running') { statusIcon = '<svg class="spinner"><use href="#spin"/></svg>'; statusText = '分析中'; }
+        else if (status === 'completed') { statusIcon = '✓'; statusText = '完成'; }
+        else if (status === 'failed') { statusIcon = '✗'; statusText = '失败'; }
+        
+        let resultHtml = '';
+        if (status === 'completed' && result.operation_advice) {
+            resultHtml = `<div class="task-result">` +
+                `<span class="task-advice ${taskData.adviceClass}">${result.operation_advice}</span>` +
+                `<span class="task-score">${result.sentiment_score || '-'}分</span>` +
+                `</div>`;
+        } else if (status === 'failed') {
+            resultHtml = '<div class="task-result"><span class="task-advice sell">失败</span></div>';
+        }
+        
+        // 单个模板字面量一次拼接完成
+        return `<div class="task-card ${status}" id="task_${taskId}" data-action="show" data-taskid="${taskId}">` +
+            `<div class="task-status">${statusIcon}</div>` +
+            `<div class="task-main">` +
+                `<div class="task-title">` +
+                    `<span class="code">${code}</span>` +
+                    (result.name ? `<span class="name">${result.name}</span>` : '') +
+                `</div>` +
+                `<div class="task-meta">` +
+                    `<span>⏱ ${formatTime(task.start_time)}</span>` +
+                    `<span>⏳ ${calcDuration(task.start_time, task.end_time)}</span>` +
+                `</div>` +
+            `</div>` +
+            resultHtml +
+            `<div class="task-actions">` +
+                `<button class="task-btn" data-action="remove" data-taskid="${taskId}">×</button>` +
+            `</div>` +
+        `</div>`;
+    }
+    
+    // 保存任务快照（合并短时间内的多次变更，只写一次）
+    function persistTasks() {
+        if (persistTimer) return;
+        persistTimer = setTimeout(() => {
+            persistTimer = null;
+            const cutoff = Date.now() - TASKS_STORAGE_TTL_MS;
+            const snapshot = [];
+            let expired = false;
+            tasks.forEach(taskData => {
+                const task = taskData.task;
+                // 尚未被服务端确认的任务不保存，避免刷新后残留无法校正的条目
+                if (!task.task_id) return;
+                const finished = task.status === 'completed' || task.status === 'failed';
+                if (finished && new Date(task.start_time).getTime() < cutoff) {
+                    expired = true;
+                    return;
+                }
+                snapshot.push(task);
+            });
+            // 快照被裁剪后与服务端列表不再一致，不能再用 ETag 协商（否则 304 会让裁掉的任务一直缺失）
+            const etag = expired ? null : tasksEtag;
+            try {
+                localStorage.setItem(TASKS_STORAGE_KEY, JSON.stringify({ etag, tasks: snapshot }));
+            } catch (e) {
+                // 存储不可用或超出配额时放弃快照，不影响页面功能
+            }
+        }, 500);
+    }
+    
+    // 读取任务快照，返回快照中的任务列表；格式不符（损坏、手动修改或未来版本）时丢弃
+    function restoreTasks() {
+        try {
+            localStorage.removeItem('tasks_v1');  // 旧版快照键，已由 tasks_v2 取代
+            const snapshot = JSON.parse(localStorage.getItem(TASKS_STORAGE_KEY) || 'null');
+            if (!snapshot) return [];
+            if (!Array.isArray(snapshot.tasks) || !snapshot.tasks.every(task => task && task.task_id)) {
+                localStorage.removeItem(TASKS_STORAGE_KEY);
+                return [];
+            }
+            tasksEtag = snapshot.etag || null;
+            return snapshot.tasks;
+        } catch (e) {
+            tasksEtag = null;
+            localStorage.removeItem(TASKS_STORAGE_KEY);
+            return [];
+        }
+    }
+    
+    // 统一的任务装载入口：本地快照与服务端列表都经由这里写入任务表并刷新页面。
+    // confirmed 表示列表来自服务端：替换已确认的旧条目、保存快照，并决定是否订阅推送（快照可能已过期，不据此订阅）
+    function hydrate(taskArr, confirmed) {
+        if (confirmed) {
+            tasks.forEach((taskData, taskId) => {
+                if (taskData.task.task_id) tasks.delete(taskId);
+            });
+        }
+        taskArr.forEach(task => tasks.set(task.task_id, toTaskData(task)));
+        trimTasks();
+        scheduleRender();
+        if (confirmed) {
+            persistTasks();
+            if (hasUnfinishedTasks()) {
+                startStream();
+            }
+        }
+    }
+    
+    // 超出显示上限时淘汰最早结束的已完成/失败任务（仅从页面移除），进行中的任务始终保留
+    function trimTasks() {
+        if (tasks.size <= MAX_TASKS_DISPLAY) return;
+        const finished = [];
+        tasks.forEach((taskData, taskId) => {
+            const task = taskData.task;
+            if (task.status === 'completed' || task.status === 'failed') {
+                finished.push([taskId, task.end_time || task.start_time || '']);
+            }
+        });
+        finished.sort((a, b) => a[1].localeCompare(b[1]));
+        for (const [taskId] of finished) {
+            if (tasks.size <= MAX_TASKS_DISPLAY) break;
+            tasks.delete(taskId);
+        }
+    }
+    
+    // 更新已有任务：开始时间（决定分组与组内顺序）不变时只在下一帧替换该卡片，否则整体重绘
+    function updateTask(task) {
+        const prev = tasks.get(task.task_id);
+        if (!prev) return;
+        // 任务结束后状态不会再变：迟到的旧响应（如推送之后才返回的批量查询）不能把它改回进行中
+        const prevStatus = prev.task?.status;
+        if ((prevStatus === 'completed' || prevStatus === 'failed') &&
+            task.status !== 'completed' && task.status !== 'failed') {
+            return;
+        }
+        tasks.set(task.task_id, toTaskData(task));
+        persistTasks();
+        if (prev.task?.start_time === task.start_time) {
+            scheduleRender(task.task_id);
+        } else {
+            scheduleRender();
+        }
+    }
+    
+    // 删除任务：卡片移除与组计数更新随下一帧批量写入，分组变空时整体重绘
+    function dropTask(taskId) {
+        if (!tasks.delete(taskId)) return;
+        renderedCards.delete(taskId);
+        dirtyTaskIds.delete(taskId);
+        removedTaskIds.add(taskId);
+        persistTasks();
+        requestFlush();
+    }
+    
+    // 移除任务
+    window.removeTask = function(taskId) {
+        if (confirm('确定删除该任务历史记录？')) {
+            // 先从前端移除以快速响应
+            dropTask(taskId);
+            checkStopStream();
+            
+            // 后台发送删除请求
+            fetch('/task/delete', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                },
+                body: 'task_id=' + encodeURIComponent(taskId)
+            }).then(r => r.json())
+              .then(data => {
+                  if (!data.success) {
+                      console.error('删除失败:', data.error);
+                  }
+              })
+              .catch(err => console.error('删除请求错误:', err));
+        }
+    };
+    
+    // 切换组展开状态
+    window.toggleGroup = function(dateStr) {
+        const groupContent = document.getElementById('group_content_' + dateStr);
+        const groupHeader = document.getElementById('group_header_' + dateStr);
+        if (groupContent && groupHeader) {
+            const isCollapsed = groupContent.classList.contains('collapsed');
+            if (isCollapsed) {
+                groupContent.classList.remove('collapsed');
+                groupHeader.classList.remove('collapsed');
+            } else {
+                groupContent.classList.add('collapsed');
+                groupHeader.classList.add('collapsed');
+            }
+        }
+    };
+
+    // 数据更新触发的 DOM 写入合并到下一帧执行：传入 taskId 只替换该卡片，不传则整体重绘；
+    // 同一帧内的多次更新、删除只写一次 DOM。用户操作需要即时反馈时仍直接调用 renderAllTasks()
+    let renderScheduled = false;
+    let fullRenderPending = false;
+    const dirtyTaskIds = new Set();
+    const removedTaskIds = new Set();
+    const renderedCards = new Map();  // taskId -> 上次写入 DOM 的卡片标记，相同则跳过
+    
+    function scheduleRender(taskId) {
+        if (taskId === undefined) {
+            fullRenderPending = true;
+        } else {
+            dirtyTaskIds.add(taskId);
+        }
+        requestFlush();
+    }
+    
+    function requestFlush() {
+        if (renderScheduled) return;
+        renderScheduled = true;
+        requestAnimationFrame(flushRender);
+    }
+    
+    // 分层批处理：第一层只读 DOM（定位卡片、生成标记、统计分组数量），
+    // 第二层集中移除/替换/插入卡片，第三层统一回写分组计数
+    function flushRender() {
+        renderScheduled = false;
+        const ids = [...dirtyTaskIds];
+        const removedIds = [...removedTaskIds];
+        dirtyTaskIds.clear();
+        removedTaskIds.clear();
+        if (fullRenderPending) {
+            fullRenderPending = false;
+            renderAllTasks();
+            return;
+        }
+        
+        // 第一层（读）：要移除的卡片，分组因此变空时改为整体重绘
+        const removals = [];
+        const groupCounts = new Map();  // 分组内容元素 -> 本帧写入后的卡片数
+        for (const taskId of removedIds) {
+            const card = document.getElementById('task_' + taskId);
+            if (!card) continue;
+            const groupContent = card.parentElement;
+            const left = (groupCounts.get(groupContent) ?? groupContent.children.length) - 1;
+            if (left === 0) {
+                renderAllTasks();
+                return;
+            }
+            groupCounts.set(groupContent, left);
+            removals.push(card);
+        }
+        
+        // 第一层（读）：生成新标记并与上次写入的比对，只保留真正变化的卡片；
+        // 卡片不存在时插入所属分组，分组也不存在时改为整体重绘
+        const replaces = [];
+        const inserts = [];
+        for (const taskId of ids) {
+            const taskData = tasks.get(taskId);
+            if (!taskData) continue;  // 期间已被删除
+            const html = renderTaskCard(taskId, taskData);
+            if (renderedCards.get(taskId) === html) continue;
+            const card = document.getElementById('task_' + taskId);
+            if (card) {
+                replaces.push([taskId, card, html]);
+                continue;
+            }
+            const groupContent = document.getElementById('group_content_' + taskData.dateStr);
+            if (!groupContent) {
+                renderAllTasks();
+                return;
+            }
+            inserts.push([taskId, groupContent, html]);
+            groupCounts.set(groupContent, (groupCounts.get(groupContent) ?? groupContent.children.length) + 1);
+        }
+        
+        // 第二层（写）：集中移除/替换/插入
+        removals.forEach(card => card.remove());
+        replaces.forEach(([taskId, card, html]) => {
+            card.outerHTML = html;
+            renderedCards.set(taskId, html);
+        });
+        inserts.forEach(([taskId, groupContent, html]) => {
+            // 组内按开始时间倒序：插在第一张开始时间更早的卡片之前
+            const start = tasks.get(taskId).task.start_time || '';
+            const before = Array.from(groupContent.children).find(
+                el => (tasks.get(el.dataset.taskid)?.task.start_time || '') < start
+            ) || null;
+            const tpl = document.createElement('template');
+            tpl.innerHTML = html;
+            groupContent.insertBefore(tpl.content.firstChild, before);
+            renderedCards.set(taskId, html);
+        });
+        
+        // 第三层（写）：分组计数
+        groupCounts.forEach((n, groupContent) => {
+            const count = groupContent.parentElement.querySelector('.group-count');
+            if (count) count.textContent = n;
+        });
+    }
+    
+    // 渲染所有任务（分组显示）
+    function renderAllTasks() {
+        renderedCards.clear();
+        if (tasks.size === 0) {
+            taskList.innerHTML = '<div class="task-hint">💡 输入股票代码开始分析</div>';
+            return;
+        }
+        
+        // 1. 分组
+        const groups = {}; // date(YYYY-MM-DD) -> [taskData]
+        const today = getToday();
+        
+        tasks.forEach((taskData, taskId) => {
+            const dateStr = taskData.dateStr;
+            if (!groups[dateStr]) groups[dateStr] = [];
+            groups[dateStr].push({ id: taskId, data: taskData });
+        });
+        
+        // 2. 排序日期（倒序）
+        const sortedDates = Object.keys(groups).sort((a, b) => b.localeCompare(a));
+        
+        // 直接用 += 拼接字符串（现代引擎下比数组 join 更快）
+        let html = '';
+        
+        sortedDates.forEach(dateStr => {
+            const groupTasks = groups[dateStr];
+            // 组内按时间倒序
+            groupTasks.sort((a, b) => (b.data.task?.start_time || '').localeCompare(a.data.task?.start_time || ''));
+            
+            const isToday = dateStr === today;
+            const collapsedClass = isToday ? '' : 'collapsed'; // 今天默认展开，其他折叠
+            
+            // Group Header + Group Content
+            html += `<div class="task-group">` +
+                `<div class="group-header ${collapsedClass}" id="group_header_${dateStr}" data-action="toggle" data-date="${dateStr}">` +
+                    `<span class="group-title"><span class="arrow">▼</span> 📅 ${isToday ? '今天' : dateStr}</span>` +
+                    `<span class="group-count">${groupTasks.length}</span>` +
+                `</div>` +
+                `<div class="group-content ${collapsedClass}" id="group_content_${dateStr}">`;
+            groupTasks.forEach(item => {
+                const cardHtml = renderTaskCard(item.id, item.data);
+                renderedCards.set(item.id, cardHtml);
+                html += cardHtml;
+            });
+            html += `</div></div>`; // end group-content, task-group
+        });
+        
+        taskList.innerHTML = html;
+    }
+    
+    // 显示分析结果到右侧面板
+    window.showResult = function(taskId) {
+        const taskData = tasks.get(taskId);
+        if (!taskData || !taskData.task) return;
+        
+        const task = taskData.task;
+        const result = task.result || {};
+        const code = task.code || taskId.split('_')[0];
+        
+        // 构建 Markdown 内容
+        let markdown = '';
+        
+        if (task.status === 'completed' && result.name) {
+            markdown = '# ' + result.name + ' (' + code.toUpperCase() + ')\n\n';
+            
+            // 如果是详情模式，生成详细报告
+            if (window.isDetailMode) {
+                 markdown += generateDetailMarkdown(result, code);
+            } else {
+                // 标准模式
+                if (result.operation_advice) {
+                    markdown += '## 操作建议\n';
+                    markdown += '**' + result.operation_advice + '**';
+                    if (result.sentiment_score) {
+                        markdown += ' (评分: ' + result.sentiment_score + ')\n\n';
+                    } else {
+                        markdown += '\n\n';
+                    }
+                }
+                
+                if (result.trend_prediction) {
+                    markdown += '## 趋势预测\n';
+                    markdown += result.trend_prediction + '\n\n';
+                }
+                
+                if (result.analysis_summary) {
+                    markdown += '## 分析摘要\n';
+                    markdown += result.analysis_summary + '\n\n';
+                }
+                
+                if (result.full_analysis) {
+                    markdown = result.full_analysis;
+                }
+
+            }
+        } else if (task.status === 'running') {
+            markdown = '# ' + code.toUpperCase() + '\n\n';
+            markdown += '⏳ **正在分析中...**\n\n';
+            markdown += '请稍候，分析完成后将自动更新结果。';
+        } else if (task.status === 'failed') {
+            markdown = '# ' + code.toUpperCase() + '\n\n';
+            markdown += '❌ **分析失败**\n\n';
+            if (task.error) {
+                markdown += '错误信息: ' + task.error;
+            }
+        } else {
+            markdown = '# ' + code.toUpperCase() + '\n\n';
+            markdown += '暂无分析结果';
+        }
+        
+        // 渲染 Markdown
+        const panel = document.getElementById('result_panel');
+        const placeholder = document.getElementById('result_placeholder');
+        const content = document.getElementById('result_content');
+        const title = document.getElementById('result_title');
+        const markdownDiv = document.getElementById('markdown_content');
+        const detailBtn = document.getElementById('btn_detail_toggle');
+        
+        // 保存当前查看的任务ID
+        window.currentTaskId = taskId;
+        
+        panel.classList.add('has-content');
+        placeholder.style.display = 'none';
+        content.style.display = 'flex';
+        content.style.flexDirection = 'column';
+        content.style.flex = '1';
+        
+        if (detailBtn) {
+            if (task.status === 'completed' && result.name) {
+                detailBtn.style.display = 'block';
+                detailBtn.textContent = window.isDetailMode ? '返回摘要' : '查看详情';
+                if (window.isDetailMode) {
+                    detailBtn.classList.add('active');
+                } else {
+                    detailBtn.classList.remove('active');
+                }
+            } else {
+                detailBtn.style.display = 'none';
+            }
+        }
+        
+        title.textContent = result.name ? result.name + ' (' + code.toUpperCase() + ')' : code.toUpperCase() + ' 分析结果';
+        
+        renderMarkdown(markdownDiv, markdown);
+    };
+    
+    // 切换详情模式
+    window.toggleDetailMode = function() {
+        window.isDetailMode = !window.isDetailMode;
+        if (window.currentTaskId) {
+            window.showResult(window.currentTaskId);
+        }
+    };
+    
+    // 生成详细 Markdown (仿照 Python generate_dashboard_report)
+    // 详情 Markdown 按 result 对象缓存：任务更新时 result 会被整体替换，缓存随之失效并可被回收
+    const detailMarkdownCache = new WeakMap();
+    
+    function generateDetailMarkdown(result, code) {
+        const cached = detailMarkdownCache.get(result);
+        if (cached !== undefined) return cached;
+        
+        let lines = [];
+        const dashboard = result.dashboard || {};
+        const core = dashboard.core_conclusion || {};
+        const intel = dashboard.intelligence || {};
+        const battle = dashboard.battle_plan || {};
+        const data_persp = dashboard.data_perspective || {};
+        
+        // 核心结论
+        if (dashboard) {
+            const one_sentence = core.one_sentence || result.analysis_summary;
+            const time_sense = core.time_sensitivity || '本周内';
+            
+            lines.push(`### 📌 核心结论\n`);
+            lines.push(`**${result.operation_advice}** | ${result.trend_prediction}\n`);
+            lines.push(`> **一句话决策**: ${one_sentence}\n`);
+            lines.push(`⏰ **时效性**: ${time_sense}\n`);
+        }
+        
+        // 重要信息
+        if (intel) {
+             lines.push(`### 📰 重要信息\n`);
+             
+             if (intel.earnings_outlook) {
+                 lines.push(`**📊 业绩预期**: ${intel.earnings_outlook}\n`);
+             }
+             if (intel.sentiment_summary) {
+                 lines.push(`**💭 舆情情绪**: ${intel.sentiment_summary}\n`);
+             }
+             
+             if (intel.risk_alerts && intel.risk_alerts.length > 0) {
+                 lines.push(`\n**🚨 风险警报**:`);
+                 intel.risk_alerts.forEach(alert => lines.push(`- ${alert}`));
+                 lines.push(``);
+             }
+             
+             if (intel.positive_catalysts && intel.positive_catalysts.length > 0) {
+                 lines.push(`\n**✨ 利好催化**:`);
+                 intel.positive_catalysts.forEach(cat => lines.push(`- ${cat}`));
+                 lines.push(``);
+             }
+        }
+        
+        // 操盘点位 (Battle Plan)
+        if (battle) {
+             lines.push(`### 🎯 操作点位\n`);
+             
+             const sniper = battle.sniper_points || {};
+             if (sniper) {
+                 lines.push(`| 买点 | 止损 | 目标 |`);
+                 lines.push(`|---|---|---|`);
+                 lines.push(`| ${sniper.ideal_buy || '-'} | ${sniper.stop_loss || '-'} | ${sniper.take_profit || '-'} |\n`);
+             }
+             
+             const pos = battle.position_strategy || {};
+             if (pos) {
+                 lines.push(`**持仓建议**: ${pos.suggested_position || '-'}`);
+                 if (pos.entry_plan) lines.push(`- 建仓: ${pos.entry_plan}`);
+                 if (pos.risk_control) lines.push(`- 风控: ${pos.risk_control}`);
+                 lines.push(``);
+             }
+        }
+        
+        // 如果没有 Dashboard 数据，显示一些基础信息
+        if (!dashboard || Object.keys(dashboard).length === 0) {
+            lines.push(`*(暂无详细数据，显示基础分析)*\n`);
+            if (result.analysis_summary) lines.push(result.analysis_summary);
+        }
+        
+        const markdown = lines.join('\n');
+        detailMarkdownCache.set(result, markdown);
+        return markdown;
+    }
+    
+    // 关闭结果面板
+    window.closeResult = function() {
+        const panel = document.getElementById('result_panel');
+        const placeholder = document.getElementById('result_placeholder');
+        const content = document.getElementById('result_content');
+        
+        panel.classList.remove('has-content');
+        placeholder.style.display = 'flex';
+        content.style.display = 'none';
+    };
+    
+    // 是否还有未结束的任务
+    function hasUnfinishedTasks() {
+        for (const taskData of tasks.values()) {
+            const status = taskData.task?.status;
+            if (status === 'running' || status === 'pending' || !status) {
+                return true;
+            }
+        }
+        return false;
+    }
+    
+    // 同一 URL 的 GET 请求在途时直接复用，避免重复发起（共享解析后的 JSON，Response 只能读取一次）
+    const inflightRequests = new Map();  // url -> Promise<json>
+    // 状态查询共用的中止信号：推送断开（页面隐藏、任务全部结束）时取消在途查询，避免迟到的旧响应覆盖新状态
+    let statusController = new AbortController();
+    
+    function abortStatusRequests() {
+        statusController.abort();
+        statusController = new AbortController();
+    }
+    
+    function fetchJson(url) {
+        let promise = inflightRequests.get(url);
+        if (!promise) {
+            promise = fetch(url, { signal: statusController.signal })
+                .then(r => r.json())
+                .finally(() => inflightRequests.delete(url));
+            inflightRequests.set(url, promise);
+        }
+        return promise;
+    }
+    
+    // 一次请求批量拉取多个任务的最新状态
+    function refreshTasks(taskIds) {
+        if (!taskIds.length) return Promise.resolve();
+        return fetchJson('/tasks/batch?ids=' + taskIds.map(encodeURIComponent).join(','))
+            .then(data => {
+                if (!data.success) return;
+                data.tasks.forEach(updateTask);
+                // 服务端确认过的任务查不到，说明已被删除或过期；刚提交、尚未入库的任务保留
+                data.missing.forEach(taskId => {
+                    if (tasks.get(taskId)?.task?.task_id) dropTask(taskId);
+                });
+                checkStopStream();
+            })
+            .catch(() => {});  // 网络错误或被 abortStatusRequests 取消：等待下次推送/查询
+    }
+    
+    // 未结束任务的 ID 列表
+    function unfinishedTaskIds() {
+        const ids = [];
+        tasks.forEach((taskData, taskId) => {
+            const status = taskData.task?.status;
+            if (status === 'running' || status === 'pending' || !status) {
+                ids.push(taskId);
+            }
+        });
+        return ids;
+    }
+    
+    // 退回查询模式：只批量查询已到期的任务；状态未变的任务间隔翻倍，状态变化后恢复最短间隔
+    function pollDueTasks() {
+        const now = Date.now();
+        const due = unfinishedTaskIds().filter(taskId => {
+            const entry = pollSchedule.get(taskId);
+            return !entry || entry.nextPollAt <= now;
+        });
+        if (!due.length) return;
+        
+        const before = new Map();
+        due.forEach(taskId => {
+            const entry = pollSchedule.get(taskId) || { backoffMs: FALLBACK_POLL_MIN_MS };
+            entry.nextPollAt = now + entry.backoffMs;  // 请求在途期间不再重复查询
+            pollSchedule.set(taskId, entry);
+            before.set(taskId, tasks.get(taskId)?.task?.status);
+        });
+        
+        refreshTasks(due).then(() => {
+            before.forEach((status, taskId) => {
+                const entry = pollSchedule.get(taskId);
+                if (!entry) return;
+                const changed = tasks.get(taskId)?.task?.status !== status;
+                entry.backoffMs = changed ? FALLBACK_POLL_MIN_MS : Math.min(entry.backoffMs * 2, FALLBACK_POLL_MAX_MS);
+                entry.nextPollAt = Date.now() + entry.backoffMs;
+            });
+        });
+    }
+    
+    // 订阅任务状态推送（替代定时轮询）；页面隐藏时不连接，恢复可见后再订阅
+    function startStream() {
+        if (taskStream || streamRetryTimer || document.hidden) return;
+        
+        // 不支持 SSE 的环境退回定时批量查询，对外仍表现为一个可 close() 的连接
+        if (typeof EventSource === 'undefined') {
+            const timer = setInterval(pollDueTasks, FALLBACK_POLL_TICK_MS);
+            taskStream = {
+                close: () => {
+                    clearInterval(timer);
+                    pollSchedule.clear();
+                }
+            };
+            pollDueTasks();
+            return;
+        }
+        
+        taskStream = new EventSource('/tasks/stream');
+        
+        // 连接建立后补拉一次未结束的任务，避免错过连接前的变更
+        taskStream.onopen = function() {
+            streamRetryDelay = STREAM_RETRY_MIN_MS;
+            refreshTasks(unfinishedTaskIds());
+        };
+        
+        taskStream.addEventListener('task_update', function(e) {
+            updateTask(JSON.parse(e.data));
+            checkStopStream();
+        });
+        
+        taskStream.addEventListener('task_delete', function(e) {
+            dropTask(JSON.parse(e.data).task_id);
+            checkStopStream();
+        });
+        
+        // 断线后不用浏览器固定间隔的自动重连，改为 3s → 15s 逐次退避
+        taskStream.onerror = function() {
+            stopStream();
+            streamRetryTimer = setTimeout(() => {
+                streamRetryTimer = null;
+                if (hasUnfinishedTasks()) startStream();
+            }, streamRetryDelay);
+            streamRetryDelay = Math.min(streamRetryDelay * 1.5, STREAM_RETRY_MAX_MS);
+        };
+    }
+    
+    function stopStream() {
+        if (taskStream) {
+            taskStream.close();
+            taskStream = null;
+            abortStatusRequests();
+        }
+    }
+    
+    // 没有未结束的任务时关闭推送连接
+    function checkStopStream() {
+        if (!hasUnfinishedTasks()) {
+            stopStream();
+        }
+    }
+    
+    // 加载历史任务（以服务端为准，替换快照中的条目）；带上当前列表的 ETag，列表未变化时服务端只返回 304。
+    // 在途时重复调用复用同一请求；结束后按需订阅推送
+    let historyPromise = null;
+    
+    function syncTaskHistory() {
+        if (historyPromise) return historyPromise;
+        const headers = tasksEtag && tasks.size > 0 ? { 'If-None-Match': tasksEtag } : {};
+        historyPromise = fetch('/tasks?limit=' + MAX_TASKS_DISPLAY, { headers })
+            .then(r => {
+                if (r.status === 304) return null;
+                tasksEtag = r.headers.get('ETag');
+                return r.json();
+            })
+            .then(data => {
+                if (data === null) {
+                    // 本地列表即最新，只需按需订阅推送
+                    if (hasUnfinishedTasks()) {
+                        startStream();
+                    }
+                } else if (data.success && data.tasks) {
+                    hydrate(data.tasks, true);
+                }
+            })
+            .catch(err => {
+                console.error('加载历史任务失败', err);
+            })
+            .finally(() => {
+                historyPromise = null;
+            });
+        return historyPromise;
+    }
+    
+    // 页面隐藏时断开推送、不再查询；恢复可见时先对账一次任务列表（补上隐藏期间的新增、删除），再按需重新订阅
+    document.addEventListener('visibilitychange', () => {
+        if (document.hidden) {
+            stopStream();
+        } else {
+            syncTaskHistory();
+        }
+    });
+    
+    // 提交分析
+    // 查找同一代码尚未结束的任务
+    function findUnfinishedTask(code) {
+        for (const [taskId, taskData] of tasks) {
+            const status = taskData.task?.status;
+            if (taskData.task?.code === code && (status === 'running' || status === 'pending' || !status)) {
+                return taskId;
+            }
+        }
+        return null;
+    }
+    
+    let submitInFlight = false;  // 提交请求在途时忽略重复提交（连按回车、脚本重放等）
+    
+    window.submitAnalysis = function() {
+        const code = codeInput.value.trim().toLowerCase();
+        if (submitInFlight || !isValidCode(code)) {
+            return;
+        }
+        
+        // 同一股票已在分析中时不再重复提交，直接展示已有任务
+        const existingId = findUnfinishedTask(code);
+        if (existingId) {
+            codeInput.value = '';
+            updateButtonState();
+            showResult(existingId);
+            return;
+        }
+        
+        submitInFlight = true;
+        submitBtn.disabled = true;
+        submitBtn.textContent = '提交中...';
+        
+        fetch('/analysis?code=' + encodeURIComponent(code))
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    const taskId = data.task_id;
+                    tasks.set(taskId, toTaskData({
+                        code: code,
+                        status: 'running',
+                        start_time: new Date().toISOString()
+                    }));
+                    trimTasks();
+                    
+                    renderAllTasks();
+                    startStream();
+                    codeInput.value = '';
+                    
+                    // 稍后同步一次服务端状态（开始时间等）
+                    setTimeout(() => refreshTasks([taskId]), 500);
+                } else {
+                    alert('提交失败: ' + (data.error || '未知错误'));
+                }
+            })
+            .catch(error => {
+                alert('请求失败: ' + error.message);
+            })
+            .finally(() => {
+                submitInFlight = false;
+                submitBtn.disabled = false;
+                submitBtn.textContent = '🚀 分析';
+                updateButtonState();
+            });
+    };
+    
+    // 初始化
+    updateButtonState();
+    
+    // 先用本地快照渲染，不必等待服务端响应
+    hydrate(restoreTasks(), false);
+    
+    // 与服务端同步任务列表
+    syncTaskHistory();
+})();
@@ -0,0 +1,8 @@
+// Markdown 解析 Worker：在后台线程执行 marked.parse，主线程只接收渲染好的 HTML
+// marked 地址由页面通过 ?marked= 传入，与主线程回退路径共用同一个 MARKED_URL
+importScripts(new URL(self.location.href).searchParams.get('marked'));
+
+self.onmessage = function(e) {
+    const { id, src } = e.data;
+    self.postMessage({ id, html: marked.parse(src) });
+};